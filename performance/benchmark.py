@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+
+# Times each stage of converting a reproducible, synthetic corpus of emails
+# (built with the same MIME builders as the unit tests), and writes the
+# results as JSON, so that they can be compared between releases with
+# --compare. Remote images are served from a local HTTP server, so no network
+# access is needed. Run from the top of the repository, e.g. with
+# `make benchmark`.
+
+from email.mime.multipart import MIMEMultipart
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import argparse
+import importlib.machinery
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ['parse', 'body', 'urls', 'render', 'metadata', 'attachments']
+
+SEED = 2015
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.respond()
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self):
+        if self.path.startswith('/image'):
+            with open(os.path.join(ROOT_DIRECTORY, 'tests', 'basi2c16.png'), 'rb') as image_file:
+                image_data = image_file.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(image_data)))
+            self.end_headers()
+            if self.command == 'GET':
+                self.wfile.write(image_data)
+        else:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def load_email2pdf():
+    loader = importlib.machinery.SourceFileLoader('email2pdf', os.path.join(ROOT_DIRECTORY, 'email2pdf'))
+    return loader.load_module()
+
+
+def get_builder_class():
+    # The test helpers open the test images relative to the top of the
+    # repository.
+    os.chdir(ROOT_DIRECTORY)
+    sys.path.insert(0, ROOT_DIRECTORY)
+    from tests.BaseTestClasses import Email2PDFTestCase
+
+    class CorpusBuilder(Email2PDFTestCase):
+        def __init__(self, subtype='mixed'):
+            super(CorpusBuilder, self).__init__()
+            self.msg = MIMEMultipart(subtype)
+
+    return CorpusBuilder
+
+
+def build_corpus(scale, base_url):
+    builder_class = get_builder_class()
+    rng = random.Random(SEED)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do"]
+
+    def get_text(number_of_words):
+        return " ".join(rng.choice(words) for _ in range(number_of_words))
+
+    corpus = {}
+
+    builder = builder_class()
+    builder.addHeaders(subject="Plain text")
+    builder.attachText("\n".join(get_text(rng.randint(1, 60)) for _ in range(200 * scale)))
+    corpus['plain'] = builder.msg
+
+    builder = builder_class()
+    builder.addHeaders(subject="Large HTML")
+    builder.attachHTML("<html><body>" + "".join("<p>" + get_text(100) + " <b>" + get_text(5) + "</b></p>"
+                                                for _ in range(1000 * scale)) + "</body></html>")
+    corpus['large_html'] = builder.msg
+
+    builder = builder_class()
+    builder.addHeaders(subject="Newsletter")
+    number_of_images = 20 * scale
+    rows = "".join('<tr><td><img src="cid:image' + str(counter) + '"></td><td>' + get_text(20) + '</td>'
+                   '<td><img src="' + base_url + '/image' + str(counter) + '.png"></td></tr>'
+                   for counter in range(number_of_images))
+    builder.attachHTML("<html><body><table>" + rows + '</table><img src="' + base_url + '/missing.png">'
+                       "</body></html>")
+    for counter in range(number_of_images):
+        builder.attachImage('<image' + str(counter) + '>', jpeg=bool(counter % 2), inline=True)
+    corpus['newsletter'] = builder.msg
+
+    builder = builder_class()
+    builder.addHeaders(subject="Huge attachment")
+    builder.attachText(get_text(50))
+    attachment_size = 20 * 1024 * 1024 * scale
+    builder.attachAttachment('application', 'octet-stream',
+                             rng.getrandbits(attachment_size * 8).to_bytes(attachment_size, 'little'), "huge.bin")
+    corpus['huge_attachment'] = builder.msg
+
+    builder = builder_class()
+    builder.addHeaders(subject="Nested multiparts")
+    alternative = builder_class('alternative')
+    alternative.attachText(get_text(200))
+    related = builder_class('related')
+    related.attachHTML('<html><body><p>' + get_text(200) + '</p><img src="cid:nested"></body></html>')
+    related.attachImage('<nested>', jpeg=False, inline=True)
+    alternative.msg.attach(related.msg)
+    builder.msg.attach(alternative.msg)
+    for counter in range(10 * scale):
+        builder.attachPDF(get_text(10))
+        builder.attachImage(jpeg=bool(counter % 2))
+    corpus['nested_multipart'] = builder.msg
+
+    return {name: message.as_bytes() for name, message in corpus.items()}
+
+
+def time_stages(email2pdf, args, renderer, input_data, working_directory):
+    timings = {}
+
+    def timed(stage, function, *arguments):
+        start = time.perf_counter()
+        result = function(*arguments)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    # Start each conversion as cold as a new email2pdf process would.
+    email2pdf.MIME_TYPE_CACHE.clear()
+    email2pdf.URL_CHECK_CACHE.clear()
+
+    def parse():
+        input_email = email2pdf.get_input_email(input_data)
+        return (input_email, email2pdf.MessageIndex(input_email))
+
+    (input_email, message_index) = timed('parse', parse)
+    (payload, parts_already_used) = timed('body', email2pdf.handle_message_body, args, message_index)
+    payload = timed('urls', email2pdf.remove_invalid_urls, payload, args.html_parser)
+    payload = bytes(email2pdf.get_formatted_header_info(input_email) + payload, 'UTF-8')
+
+    if renderer:
+        output_file_name = os.path.join(working_directory, "body.pdf")
+        errors = timed('render', renderer.render, [(payload, output_file_name)])
+        assert errors == [None], errors
+        timed('metadata', email2pdf.add_body_pdf_metadata, input_email, output_file_name)
+
+    timed('attachments', email2pdf.handle_attachments, message_index, working_directory, False, False,
+          parts_already_used)
+
+    return timings
+
+
+def benchmark(email2pdf, corpus, renderer_name, repeat):
+    (_, args) = email2pdf.handle_args(['email2pdf', '--renderer', renderer_name])
+
+    renderer = email2pdf.RENDERERS[renderer_name]()
+    try:
+        renderer.check_available()
+    except email2pdf.FatalException as exception:
+        print("Not timing render or metadata stages: " + exception.value, file=sys.stderr)
+        renderer = None
+
+    results = {}
+
+    for name, input_data in sorted(corpus.items()):
+        stage_timings = {}
+        for _ in range(repeat):
+            working_directory = tempfile.mkdtemp(prefix="email2pdf_benchmark")
+            try:
+                for stage, timing in time_stages(email2pdf, args, renderer, input_data, working_directory).items():
+                    stage_timings.setdefault(stage, []).append(timing)
+            finally:
+                shutil.rmtree(working_directory)
+
+        results[name] = {'bytes': len(input_data),
+                         'stages': {stage: {'best': min(timings),
+                                            'mean': statistics.mean(timings),
+                                            'median': statistics.median(timings)}
+                                    for stage, timings in stage_timings.items()}}
+
+    return results
+
+
+def get_version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=ROOT_DIRECTORY,
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, previous_results, threshold):
+    for name, result in sorted(results['messages'].items()):
+        for stage in STAGES:
+            if stage not in result['stages']:
+                continue
+
+            median = result['stages'][stage]['median']
+            line = "%-18s %-12s median %8.4fs  best %8.4fs" % (name, stage, median, result['stages'][stage]['best'])
+
+            try:
+                previous_median = previous_results['messages'][name]['stages'][stage]['median']
+            except (KeyError, TypeError):
+                previous_median = None
+
+            if previous_median:
+                ratio = median / previous_median
+                line += "  %5.2fx previous" % ratio
+                if ratio > threshold:
+                    line += "  REGRESSION"
+
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of email2pdf on a synthetic corpus of emails.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of times to convert each email.")
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier for the size of each email in the corpus.")
+    parser.add_argument("--renderer", default="wkhtmltopdf", help="Renderer to use for the render stage.")
+    parser.add_argument("--output", help="File to write the results to, as JSON.")
+    parser.add_argument("--compare", help="JSON file written by an earlier run with --output, to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Report a regression when a stage's median time is more than this many times that in "
+                        "the --compare results.")
+    args = parser.parse_args()
+
+    # The corpus deliberately includes a missing image; don't log about it.
+    logging.getLogger('email2pdf').addHandler(logging.NullHandler())
+    logging.getLogger('email2pdf').propagate = False
+
+    previous_results = None
+    if args.compare:
+        with open(args.compare) as compare_file:
+            previous_results = json.load(compare_file)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+    server.block_on_close = False
+    server_thread = threading.Thread(target=server.serve_forever)
+    server_thread.start()
+
+    try:
+        corpus = build_corpus(args.scale, 'http://127.0.0.1:' + str(server.server_port))
+        email2pdf = load_email2pdf()
+        results = {'version': get_version(),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'time': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                   'renderer': args.renderer,
+                   'repeat': args.repeat,
+                   'scale': args.scale,
+                   'messages': benchmark(email2pdf, corpus, args.renderer, args.repeat)}
+    finally:
+        server.shutdown()
+        server.server_close()
+        server_thread.join()
+
+    print_results(results, previous_results, args.threshold)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Compares the time taken by remove_invalid_urls() with each --html-parser on
+# large HTML bodies, both when no img tag needs changing (so the original
+# payload is returned as is) and when some do. No network access is needed:
+# the images are all data URIs or blacklisted. Run from the top of the
+# repository, e.g. with `make benchmark_html_parsers`.
+
+import argparse
+import importlib.machinery
+import os
+import time
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HTML_PARSERS = ['html5lib', 'lxml']
+
+
+def load_email2pdf():
+    loader = importlib.machinery.SourceFileLoader('email2pdf', os.path.join(ROOT_DIRECTORY, 'email2pdf'))
+    return loader.load_module()
+
+
+def build_payloads(rows):
+    def build_payload(img_src):
+        table_rows = "".join('<tr><td><img src="' + img_src + '" width="40"></td><td class="item">Item ' + str(counter) +
+                             ' with some <b>formatted</b> <a href="http://example.com/' + str(counter) + '">text</a>'
+                             '</td></tr>'
+                             for counter in range(rows))
+        return "<html><head><title>Newsletter</title></head><body><table>" + table_rows + "</table></body></html>"
+
+    return {'unmodified': build_payload("data:image/gif;base64,R0lGODlhAQABAAAAACw="),
+            'modified': build_payload("http://www.emltrk.com/shim.gif")}
+
+
+def benchmark(email2pdf, payloads, repeat):
+    for payload_name, payload in sorted(payloads.items()):
+        for html_parser in HTML_PARSERS:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                email2pdf.remove_invalid_urls(payload, html_parser)
+                timings.append(time.perf_counter() - start)
+            print("%-10s %-10s %6d KiB  best %7.3fs  mean %7.3fs" %
+                  (html_parser, payload_name, len(payload) // 1024, min(timings), sum(timings) / len(timings)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the email2pdf HTML parsers.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of times to process each HTML body.")
+    parser.add_argument("--rows", type=int, default=5000, help="Number of table rows (each with an image) in each body.")
+    args = parser.parse_args()
+
+    benchmark(load_email2pdf(), build_payloads(args.rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# Compares the time taken by each available --renderer to render the bodies
+# of a small corpus of emails, built from the same kind of content (and the
+# same test images) as the unit tests. Run from the top of the repository,
+# e.g. with `make benchmark_renderers`.
+
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import argparse
+import importlib.machinery
+import os
+import shutil
+import tempfile
+import time
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_email2pdf():
+    loader = importlib.machinery.SourceFileLoader('email2pdf', os.path.join(ROOT_DIRECTORY, 'email2pdf'))
+    return loader.load_module()
+
+
+def build_corpus():
+    corpus = {}
+
+    corpus['plain'] = MIMEText("A short automated notification.\n" * 20)
+
+    paragraphs = "".join("<p>" + ("Paragraph " + str(counter) + " of some longer <b>HTML</b> content, ") * 10 + "</p>"
+                         for counter in range(400))
+    corpus['long_html'] = MIMEText("<html><body>" + paragraphs + "</body></html>", 'html')
+
+    newsletter = MIMEMultipart()
+    rows = "".join('<tr><td><img src="cid:image' + str(counter) + '"></td><td>Item ' + str(counter) + '</td></tr>'
+                   for counter in range(20))
+    newsletter.attach(MIMEText("<html><body><table>" + rows + "</table></body></html>", 'html'))
+    for counter in range(20):
+        image_file_name = os.path.join(ROOT_DIRECTORY, 'tests', 'jpeg444.jpg' if counter % 2 else 'basi2c16.png')
+        with open(image_file_name, 'rb') as image_file:
+            image = MIMEImage(image_file.read())
+        image.add_header('Content-ID', '<image' + str(counter) + '>')
+        newsletter.attach(image)
+    corpus['newsletter'] = newsletter
+
+    return corpus
+
+
+def get_payloads(email2pdf, corpus):
+    (_, args) = email2pdf.handle_args(['email2pdf'])
+    payloads = {}
+
+    for name, message in corpus.items():
+        input_email = email2pdf.get_input_email(message.as_string())
+        (payload, _) = email2pdf.handle_message_body(args, email2pdf.MessageIndex(input_email))
+        payloads[name] = bytes(payload, 'UTF-8')
+
+    return payloads
+
+
+def benchmark(email2pdf, payloads, repeat):
+    for renderer_name in sorted(email2pdf.RENDERERS):
+        renderer = email2pdf.RENDERERS[renderer_name]()
+        try:
+            renderer.check_available()
+        except email2pdf.FatalException as exception:
+            print("%-12s skipped: %s" % (renderer_name, exception.value))
+            continue
+
+        output_directory = tempfile.mkdtemp(prefix="email2pdf_benchmark")
+        try:
+            for payload_name, payload in sorted(payloads.items()):
+                timings = []
+                for counter in range(repeat):
+                    output_file_name = os.path.join(output_directory, payload_name + str(counter) + ".pdf")
+                    start = time.perf_counter()
+                    errors = renderer.render([(payload, output_file_name)])
+                    timings.append(time.perf_counter() - start)
+                    assert errors == [None], errors
+                print("%-12s %-12s best %7.3fs  mean %7.3fs" %
+                      (renderer_name, payload_name, min(timings), sum(timings) / len(timings)))
+
+            jobs = [(payload, os.path.join(output_directory, payload_name + "_grouped.pdf"))
+                    for payload_name, payload in sorted(payloads.items())]
+            start = time.perf_counter()
+            errors = renderer.render(jobs)
+            assert errors == [None] * len(jobs), errors
+            print("%-12s %-12s total %6.3fs" % (renderer_name, "all, grouped", time.perf_counter() - start))
+        finally:
+            shutil.rmtree(output_directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the email2pdf body renderers.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of times to render each email.")
+    args = parser.parse_args()
+
+    email2pdf = load_email2pdf()
+    benchmark(email2pdf, get_payloads(email2pdf, build_corpus()), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+# Measures how long email2pdf takes to start and finish for runs that do
+# little work (--help, and extracting the attachment from a small email with
+# --no-body), since it is often started once per email by an MDA such as
+# getmail. It also lists which of the heavy modules each run imported, as
+# they should only be loaded when needed. Run from the top of the repository,
+# e.g. with `make benchmark_startup`.
+
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['bs4', 'chardet', 'http.client', 'magic', 'PyPDF2', 'ssl']
+
+# Runs email2pdf as __main__ in this interpreter, and then reports which of the
+# heavy modules were imported.
+RUN_AND_REPORT = """
+import runpy, sys
+sys.argv = sys.argv[1:]
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+print(' '.join(module for module in %r if module in sys.modules), file=sys.stderr)
+""" % HEAVY_MODULES
+
+
+def build_email(directory):
+    message = MIMEMultipart()
+    message['Subject'] = 'Startup benchmark'
+    message.attach(MIMEText("Some text"))
+    attachment = MIMEApplication(b"Some attachment content", 'octet-stream')
+    attachment.add_header('Content-Disposition', 'attachment', filename="attachment.bin")
+    message.attach(attachment)
+
+    email_file_name = os.path.join(directory, "email.eml")
+    with open(email_file_name, 'wb') as email_file:
+        email_file.write(message.as_bytes())
+    return email_file_name
+
+
+def run(arguments):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT_DIRECTORY, 'email2pdf')] + arguments,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def get_imported_heavy_modules(arguments):
+    process = subprocess.run([sys.executable, '-c', RUN_AND_REPORT, os.path.join(ROOT_DIRECTORY, 'email2pdf')] + arguments,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    return process.stderr.strip().splitlines()[-1] if process.stderr.strip() else ''
+
+
+def benchmark(repeat):
+    working_directory = tempfile.mkdtemp(prefix="email2pdf_benchmark")
+    try:
+        email_file_name = build_email(working_directory)
+        runs = {'help': ['--help'],
+                'no-body': ['--no-body', '-i', email_file_name, '-d', working_directory]}
+
+        for run_name, arguments in sorted(runs.items()):
+            timings = []
+            for _ in range(repeat):
+                timings.append(run(arguments))
+                for file_name in os.listdir(working_directory):
+                    if file_name != os.path.basename(email_file_name):
+                        os.remove(os.path.join(working_directory, file_name))
+            print("%-8s best %6.3fs  mean %6.3fs  heavy modules imported: %s" %
+                  (run_name, min(timings), sum(timings) / len(timings),
+                   get_imported_heavy_modules(arguments) or "none"))
+    finally:
+        shutil.rmtree(working_directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of email2pdf.")
+    parser.add_argument("--repeat", type=int, default=10, help="Number of times to run each command.")
+    args = parser.parse_args()
+
+    benchmark(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
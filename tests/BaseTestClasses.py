@@ -186,7 +186,9 @@ class Email2PDFTestCase(unittest.TestCase):
         module_path = self._get_original_script_path()
         email2pdf = self._get_email2pdf_object(module_path)
 
-        if completeMessage:
+        if isinstance(completeMessage, bytes):
+            bytes_message = completeMessage
+        elif completeMessage:
             bytes_message = bytes(completeMessage, 'utf-8')
         else:
             bytes_message = self.msg.as_bytes()
@@ -208,29 +210,53 @@ class Email2PDFTestCase(unittest.TestCase):
 
             options.extend(extraParams)
 
-            stream = io.StringIO()
-            stream_handler = logging.StreamHandler(stream)
-            log = logging.getLogger('email2pdf')
-            log.propagate = False
-            log.setLevel(logging.DEBUG)
-            log.addHandler(stream_handler)
+            return self._invokeMainDirectly(email2pdf, options)
 
-            self.time_invoked = datetime.now()
+    def invokeBatchDirectly(self, inputMaildir=None, inputMbox=None, outputDirectory=None, extraParams=None):
+        module_path = self._get_original_script_path()
+        email2pdf = self._get_email2pdf_object(module_path)
 
-            try:
-                email2pdf.main(options, None, stream_handler)
-            finally:
-                self.time_completed = datetime.now()
-                for handler in log.handlers:
-                    handler.close()
-                    log.removeHandler(handler)
-                for log_filter in log.filters:
-                    log.removeFilter(log_filter)
-                stream_handler.close()
-
-            error = stream.getvalue()
-
-            return error
+        options = [module_path]
+
+        if inputMaildir:
+            options.extend(['--input-maildir', inputMaildir])
+
+        if inputMbox:
+            options.extend(['--input-mbox', inputMbox])
+
+        options.extend(['-d', outputDirectory if outputDirectory else self.workingDir])
+
+        if extraParams is None:
+            extraParams = []
+
+        options.extend(extraParams)
+
+        return self._invokeMainDirectly(email2pdf, options)
+
+    def _invokeMainDirectly(self, email2pdf, options):
+        stream = io.StringIO()
+        stream_handler = logging.StreamHandler(stream)
+        log = logging.getLogger('email2pdf')
+        log.propagate = False
+        log.setLevel(logging.DEBUG)
+        log.addHandler(stream_handler)
+
+        self.time_invoked = datetime.now()
+
+        try:
+            email2pdf.main(options, None, stream_handler)
+        finally:
+            self.time_completed = datetime.now()
+            for handler in list(log.handlers):
+                handler.close()
+                log.removeHandler(handler)
+            for log_filter in list(log.filters):
+                log.removeFilter(log_filter)
+            stream_handler.close()
+
+        error = stream.getvalue()
+
+        return error
 
     def setPlainContent(self, content, charset='UTF-8'):
         if isinstance(self.msg, MIMEMultipart):
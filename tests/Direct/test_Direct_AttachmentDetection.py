@@ -1,6 +1,15 @@
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.message import MIMEMessage
 from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
 
+import email.policy
+import io
 import os
+import random
+import stat
+import unittest.mock
 
 from tests.BaseTestClasses import Email2PDFTestCase
 
@@ -133,3 +142,133 @@ class AttachmentDetection(Email2PDFTestCase):
         self.assertEqual('', error)
         self.assertFalse(self.existsByTimeWarning())
         self.assertFalse(self.existsByTimeOriginal())
+
+    def test_large_attachments_streamed(self):
+        binary_data = random.Random(0).randbytes(3 * 1024 * 1024 + 5)
+        text_data = ("Some text = with \u00e9quals signs and a long line " * 100 + "\n") * 300
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        self.attachAttachment("application", "octet-stream", binary_data, "large.bin")
+        part = MIMEBase("application", "x-log")
+        part.set_payload(text_data.encode('utf-8'))
+        encoders.encode_quopri(part)
+        part.add_header('Content-Disposition', 'attachment', filename="large.txt")
+        self.msg.attach(part)
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        with open(os.path.join(self.workingDir, "large.bin"), 'rb') as binary_file:
+            self.assertEqual(binary_data, binary_file.read())
+        with open(os.path.join(self.workingDir, "large.txt"), 'rb') as text_file:
+            self.assertEqual(text_data.encode('utf-8'), text_file.read())
+        self.assertEqual([], [name for name in os.listdir(self.workingDir) if name.startswith(".")])
+        mode = stat.S_IMODE(os.stat(os.path.join(self.workingDir, "large.bin")).st_mode)
+        self.assertEqual(0, mode & stat.S_IXUSR)
+
+    def test_deduplicate_attachments(self):
+        shared_data = random.Random(1).randbytes(100000)
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        self.attachAttachment("application", "octet-stream", shared_data, "first.bin")
+        self.attachAttachment("application", "octet-stream", shared_data, "second.bin")
+        self.attachAttachment("application", "octet-stream", b"Something else", "other.bin")
+        error = self.invokeDirectly(extraParams=['--deduplicate-attachments'])
+        self.assertEqual('', error)
+        error = self.invokeDirectly(extraParams=['--deduplicate-attachments'])
+        self.assertEqual('', error)
+
+        objects_dir = os.path.join(self.workingDir, ".email2pdf_objects")
+        self.assertEqual(2, len(os.listdir(objects_dir)))
+        file_names = ["first.bin", "second.bin", "first_1.bin", "second_1.bin"]
+        for file_name in file_names:
+            with open(os.path.join(self.workingDir, file_name), 'rb') as attachment_file:
+                self.assertEqual(shared_data, attachment_file.read())
+        self.assertEqual(1, len(set(os.stat(os.path.join(self.workingDir, file_name)).st_ino for file_name in file_names)))
+        self.assertEqual(5, os.stat(os.path.join(self.workingDir, "first.bin")).st_nlink)
+        self.assertEqual(3, os.stat(os.path.join(self.workingDir, "other.bin")).st_nlink)
+        self.assertEqual([".email2pdf_objects"], [name for name in os.listdir(self.workingDir) if name.startswith(".")])
+        mode = stat.S_IMODE(os.stat(os.path.join(self.workingDir, "first.bin")).st_mode)
+        self.assertEqual(0, mode & stat.S_IXUSR)
+        self.assertNotEqual(0, mode & stat.S_IRUSR)
+
+    def test_deduplicate_attachments_link_name_taken(self):
+        import email2pdf
+        object_file_name = os.path.join(self.workingDir, "object")
+        with open(object_file_name, 'wb') as object_file:
+            object_file.write(b"Some content")
+        open(os.path.join(self.workingDir, ".email2pdf_linktaken"), 'w').close()
+        attachment_store = email2pdf.AttachmentStore(os.path.join(self.workingDir, ".email2pdf_objects"))
+        with unittest.mock.patch('secrets.token_hex', side_effect=["taken", "free"]):
+            link_file_name = attachment_store.link_to_temporary_name(object_file_name, self.workingDir)
+        self.assertEqual(os.path.join(self.workingDir, ".email2pdf_linkfree"), link_file_name)
+        self.assertEqual(os.stat(object_file_name).st_ino, os.stat(link_file_name).st_ino)
+        self.assertEqual(0, os.path.getsize(os.path.join(self.workingDir, ".email2pdf_linktaken")))
+
+    def test_attachment_chunk_boundaries(self):
+        import email2pdf
+        self.attachAttachment("application", "octet-stream", b"\x00\xff" * 1000 + b"end", "chunked.bin")
+        part = self.msg.get_payload()[-1]
+        original_chunk_size = email2pdf.ATTACHMENT_DECODE_CHUNK_SIZE
+        try:
+            for chunk_size in (7, 76, 77, 1000):
+                email2pdf.ATTACHMENT_DECODE_CHUNK_SIZE = chunk_size
+                output_file = io.BytesIO()
+                email2pdf.write_part_payload(part, output_file)
+                self.assertEqual(part.get_payload(decode=True), output_file.getvalue())
+        finally:
+            email2pdf.ATTACHMENT_DECODE_CHUNK_SIZE = original_chunk_size
+
+    def test_large_attachments_spilled(self):
+        binary_data = random.Random(0).randbytes(3 * 1024 * 1024 + 5)
+        text_data = ("Some text = with \u00e9quals signs and a long line " * 100 + "\n") * 300
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        self.attachAttachment("application", "octet-stream", binary_data, "large.bin")
+        part = MIMEBase("application", "x-log")
+        part.set_payload(text_data.encode('utf-8'))
+        encoders.encode_quopri(part)
+        part.add_header('Content-Disposition', 'attachment', filename="large.txt")
+        self.msg.attach(part)
+        error = self.invokeDirectly(extraParams=['--spill-threshold', '64'])
+        self.assertEqual('', error)
+        with open(os.path.join(self.workingDir, "large.bin"), 'rb') as binary_file:
+            self.assertEqual(binary_data, binary_file.read())
+        with open(os.path.join(self.workingDir, "large.txt"), 'rb') as text_file:
+            self.assertEqual(text_data.encode('utf-8'), text_file.read())
+        self.assertRegex(self.getPDFText(self.getTimedFilename()), "Some basic textual content")
+
+    def test_spilled_parts_same_as_parsed(self):
+        import email2pdf
+        self.addHeaders()
+        self.msg.preamble = "A preamble"
+        self.msg.epilogue = "An epilogue\n"
+        related = MIMEMultipart('related')
+        related.attach(MIMEText('<p>Some HTML</p><img src="cid:myid">', 'html'))
+        image = MIMEBase('image', 'png')
+        image.set_payload(random.Random(1).randbytes(5000))
+        encoders.encode_base64(image)
+        image['Content-ID'] = '<myid>'
+        related.attach(image)
+        self.msg.attach(related)
+        self.attachAttachment("application", "octet-stream", b"Small", "small.bin")
+        self.attachAttachment("application", "octet-stream", random.Random(2).randbytes(100000), "large.bin")
+        forwarded = MIMEMultipart()
+        forwarded.attach(MIMEBase('application', 'pdf'))
+        forwarded.get_payload()[0].set_payload(random.Random(3).randbytes(10000))
+        encoders.encode_base64(forwarded.get_payload()[0])
+        self.msg.attach(MIMEMessage(forwarded))
+
+        for policy in (email.policy.compat32, email.policy.SMTP):
+            input_data = self.msg.as_bytes(policy=policy)
+            parsed_parts = list(email2pdf.get_input_email(input_data).walk())
+            spilled_parts = list(email2pdf.get_input_email(input_data, 1024).walk())
+            self.assertEqual(len(parsed_parts), len(spilled_parts))
+            self.assertEqual(2, len([part for part in spilled_parts if part.spilled_payload is not None]))
+            for parsed_part, spilled_part in zip(parsed_parts, spilled_parts):
+                self.assertEqual(parsed_part.items(), spilled_part.items())
+                self.assertEqual(parsed_part.preamble, spilled_part.preamble)
+                self.assertEqual(parsed_part.epilogue, spilled_part.epilogue)
+                if not parsed_part.is_multipart():
+                    self.assertEqual(parsed_part.get_payload(), spilled_part.get_payload())
+                    output_file = io.BytesIO()
+                    email2pdf.write_part_payload(spilled_part, output_file)
+                    self.assertEqual(parsed_part.get_payload(decode=True), output_file.getvalue())
@@ -19,3 +19,89 @@ class Direct_BasicPlain(Email2PDFTestCase):
         self.assertRegex(self.getPDFText(path), "<angle bracket test>")
         self.assertFalse(self.existsByTimeWarning())
         self.assertFalse(self.existsByTimeOriginal())
+
+    def test_8bit_utf8_without_input_encoding(self):
+        path = os.path.join(self.examineDir, "8bit_utf8_without_input_encoding.pdf")
+        input_email = ("From: \"XYZ\" <xyz@abc.uk>\n"
+                       "To: \"XYZ\" <xyz@gmail.com>\n"
+                       "Subject: Price in £\n"
+                       "Content-Type: text/plain; charset=UTF-8\n"
+                       "Content-Transfer-Encoding: 8bit\n"
+                       "\n"
+                       "Price is £45.00\n")
+        error = self.invokeDirectly(outputFile=path, completeMessage=input_email, extraParams=['--headers'])
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual('', error)
+        self.assertRegex(self.getPDFText(path), r"Price\sis\s£45.00")
+        self.assertRegex(self.getPDFText(path), r"Price\sin\s£")
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_original_kept_as_bytes(self):
+        input_email = (b"From: \"XYZ\" <xyz@abc.uk>\n"
+                       b"Subject: Blah\n"
+                       b"Content-Type: text/plain; charset=ISO-8859-1\n"
+                       b"Content-Transfer-Encoding: 8bit\n"
+                       b"\n"
+                       b"Price is \xa345.00\n")
+        error = self.invokeDirectly(completeMessage=input_email, extraParams=['--no-body'])
+        self.assertRegex(error, "body.*any.*attachments")
+        self.assertTrue(self.existsByTimeOriginal())
+        with open(self.getTimedFilename(postfix=self.ORIGINAL_EMAIL_POSTFIX), 'rb') as original_file:
+            self.assertEqual(input_email, original_file.read())
+
+    def test_long_lines_wrapped(self):
+        path = os.path.join(self.examineDir, "long_lines_wrapped_plain.pdf")
+        self.setPlainContent("start " + "x" * 200 + " end\n" + "word " * 40 + "\n<tag> & more")
+        error = self.invokeDirectly(outputFile=path)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual('', error)
+        self.assertRegex(self.getPDFText(path), "start")
+        self.assertRegex(self.getPDFText(path), "<tag> & more")
+
+    def test_wrap_same_as_textwrap(self):
+        import email2pdf
+        import textwrap
+        lines = ['', '   ', 'short line   ', '\tindented\twith tabs ', ' ' * 100, 'x' * 80, 'x' * 81,
+                 'y' * 79 + '  ' + 'z' * 90, ' ' * 79 + 'a' * 100, 'word ' * 50, '  leading ' + 'word ' * 30 + '   ',
+                 'a' * 80 + ' ' * 100 + 'b', 'hyphen-ated ' * 20, 'non\xa0breaking ' * 20, 'ünïcödé ' * 30,
+                 'a ' + 'b' * 78 + ' ' + 'c' * 200]
+        for line in lines:
+            self.assertEqual(textwrap.fill(line, width=80), email2pdf.wrap_plain_text_line(line), repr(line))
+
+    def test_direct_plain_text(self):
+        path = os.path.join(self.examineDir, "direct_plain_text.pdf")
+        self.addHeaders()
+        self.setPlainContent("Some plain text with <angle brackets> & ünïcödé\n" + "word " * 40)
+        error = self.invokeDirectly(outputFile=path, extraParams=['--direct-plain-text', '--headers', '-v'])
+        self.assertRegex(error, "Writing plain text body directly")
+        self.assertNotRegex(error, "WARNING|ERROR")
+        self.assertTrue(os.path.exists(path))
+        text = self.getPDFText(path)
+        self.assertRegex(text, "Some plain text with <angle brackets> & ünïcödé")
+        self.assertRegex(text, "Subject: " + self.DEFAULT_SUBJECT)
+        self.assertRegex(text, "(word ){15}word\n")
+        self.assertEqual(self.DEFAULT_SUBJECT, self.getMetadataField(path, "Title"))
+        self.assertEqual(self.DEFAULT_FROM, self.getMetadataField(path, "Author"))
+        self.assertEqual("email2pdf", self.getMetadataField(path, "Producer"))
+
+    def test_direct_plain_text_no_headers(self):
+        path = os.path.join(self.examineDir, "direct_plain_text_no_headers.pdf")
+        self.addHeaders(frm=None, subject=None)
+        self.setPlainContent("Some plain text")
+        error = self.invokeDirectly(outputFile=path, extraParams=['--direct-plain-text', '-v'])
+        self.assertRegex(error, "Writing plain text body directly")
+        self.assertNotRegex(error, "WARNING|ERROR")
+        for field_name in ("Author", "Title", "Subject", "Creator"):
+            self.assertIn(self.getMetadataField(path, field_name), (None, ""))
+        self.assertEqual("email2pdf", self.getMetadataField(path, "Producer"))
+
+    def test_direct_plain_text_fallback(self):
+        path = os.path.join(self.examineDir, "direct_plain_text_fallback.pdf")
+        self.addHeaders()
+        self.setPlainContent("Some plain text in 漢字")
+        error = self.invokeDirectly(outputFile=path, extraParams=['--direct-plain-text', '-v'])
+        self.assertRegex(error, "rendering it as HTML")
+        self.assertNotRegex(error, "WARNING|ERROR")
+        self.assertTrue(os.path.exists(path))
+        self.assertRegex(self.getPDFText(path), "Some plain text in")
@@ -0,0 +1,288 @@
+from email.mime.multipart import MIMEMultipart
+from itertools import chain
+
+import glob
+import json
+import mailbox
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from tests import BaseTestClasses
+
+
+class Direct_Batch(BaseTestClasses.Email2PDFTestCase):
+    def setUp(self):
+        super(Direct_Batch, self).setUp()
+        self.mailboxDir = tempfile.mkdtemp(dir='/tmp')
+
+    def addMessage(self, input_mailbox, text=None, pdf_text=None):
+        self.msg = MIMEMultipart()
+        self.addHeaders()
+        if text:
+            self.attachText(text)
+        if pdf_text:
+            filename = self.attachPDF(pdf_text)
+        else:
+            filename = None
+        input_mailbox.add(self.msg.as_bytes())
+        return filename
+
+    def getOutputPDFs(self):
+        return sorted(glob.glob(os.path.join(self.workingDir, "*T*.pdf")))
+
+    def test_maildir(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        self.addMessage(maildir, text="First message")
+        filename = self.addMessage(maildir, text="Second message", pdf_text="Some PDF content")
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"))
+        self.assertEqual('', error)
+        output_pdfs = self.getOutputPDFs()
+        self.assertEqual(2, len(output_pdfs))
+        texts = "".join([self.getPDFText(output_pdf) for output_pdf in output_pdfs])
+        self.assertRegex(texts, "First message")
+        self.assertRegex(texts, "Second message")
+        self.assertTrue(os.path.exists(os.path.join(self.workingDir, filename)))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_mbox(self):
+        mbox = mailbox.mbox(os.path.join(self.mailboxDir, "mbox"))
+        for counter in range(3):
+            self.addMessage(mbox, text="Message number " + str(counter))
+        mbox.close()
+        error = self.invokeBatchDirectly(inputMbox=os.path.join(self.mailboxDir, "mbox"))
+        self.assertEqual('', error)
+        self.assertEqual(3, len(self.getOutputPDFs()))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_warning_per_message(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        self.addMessage(maildir)
+        self.addMessage(maildir, pdf_text="Some PDF content")
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"), extraParams=['--no-body'])
+        self.assertRegex(error, "body.*any.*attachments")
+        warning_files = glob.glob(os.path.join(self.workingDir, "*" + self.WARNINGS_AND_ERRORS_POSTFIX))
+        original_files = glob.glob(os.path.join(self.workingDir, "*" + self.ORIGINAL_EMAIL_POSTFIX))
+        self.assertEqual(1, len(warning_files))
+        self.assertEqual(1, len(original_files))
+
+    def test_warning_per_message_no_body(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        for counter in range(3):
+            self.addMessage(maildir, text="Message number " + str(counter))
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"), extraParams=['--no-body'])
+        self.assertRegex(error, "body.*any.*attachments")
+        warning_files = glob.glob(os.path.join(self.workingDir, "*" + self.WARNINGS_AND_ERRORS_POSTFIX))
+        original_files = glob.glob(os.path.join(self.workingDir, "*" + self.ORIGINAL_EMAIL_POSTFIX))
+        self.assertEqual(3, len(warning_files))
+        self.assertEqual(3, len(original_files))
+        originals = "".join(open(original_file).read() for original_file in original_files)
+        for counter in range(3):
+            self.assertRegex(originals, "Message number " + str(counter))
+
+    def test_warning_per_message_no_body_parallel(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        for counter in range(12):
+            self.addMessage(maildir, text="Message number " + str(counter))
+        self.addMessage(maildir, pdf_text="Some PDF content")
+        maildir.close()
+        self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                 extraParams=['--no-body', '--jobs', '4'])
+        warning_files = glob.glob(os.path.join(self.workingDir, "*" + self.WARNINGS_AND_ERRORS_POSTFIX))
+        original_files = glob.glob(os.path.join(self.workingDir, "*" + self.ORIGINAL_EMAIL_POSTFIX))
+        self.assertEqual(12, len(warning_files))
+        self.assertEqual(12, len(original_files))
+        for warning_file in warning_files:
+            with open(warning_file) as warning_file_handle:
+                self.assertEqual(1, len(warning_file_handle.readlines()))
+        originals = [open(original_file).read() for original_file in original_files]
+        for counter in range(12):
+            self.assertEqual(1, len([original for original in originals
+                                     if "Message number " + str(counter) + "\n" in original]))
+
+    def test_fatal_message_doesnt_stop_batch(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        maildir.add(b"This is total junk")
+        self.addMessage(maildir, text="Good message")
+        maildir.close()
+        with self.assertRaisesRegex(Exception, "1 of 2 messages could not be converted"):
+            self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"))
+        output_pdfs = self.getOutputPDFs()
+        self.assertEqual(1, len(output_pdfs))
+        self.assertRegex(self.getPDFText(output_pdfs[0]), "Good message")
+
+    def test_parallel(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        filenames = [self.addMessage(maildir, text="Message number " + str(counter), pdf_text="PDF " + str(counter))
+                     for counter in range(6)]
+        maildir.add(b"This is total junk")
+        maildir.close()
+        with self.assertRaisesRegex(Exception, "1 of 7 messages could not be converted"):
+            self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                     extraParams=['--jobs', '3', '--max-renderers', '1'])
+        self.assertEqual(6, len(self.getOutputPDFs()))
+        for filename in filenames:
+            self.assertTrue(os.path.exists(os.path.join(self.workingDir, filename)))
+
+    def test_render_batch_size(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        for counter in range(5):
+            self.addMessage(maildir, text="Message number " + str(counter))
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                         extraParams=['--render-batch-size', '2'])
+        self.assertEqual('', error)
+        output_pdfs = self.getOutputPDFs()
+        self.assertEqual(5, len(output_pdfs))
+        texts = "".join([self.getPDFText(output_pdf) for output_pdf in output_pdfs])
+        for counter in range(5):
+            self.assertRegex(texts, "Message number " + str(counter))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_render_batch_size_relative_reference(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        for counter in range(2):
+            self.msg = MIMEMultipart()
+            self.addHeaders()
+            self.attachHTML('<link rel="stylesheet" href="style.css"><p>Message number ' + str(counter) + '</p>'
+                            '<iframe src="../0/body.html"></iframe>')
+            maildir.add(self.msg.as_bytes())
+        maildir.close()
+        texts = []
+        for render_batch_size in ('1', '2'):
+            error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                             extraParams=['--render-batch-size', render_batch_size])
+            self.assertEqual('', error)
+            output_pdfs = self.getOutputPDFs()
+            self.assertEqual(2, len(output_pdfs))
+            texts.append(sorted(self.getPDFText(output_pdf) for output_pdf in output_pdfs))
+            for output_pdf in output_pdfs:
+                os.remove(output_pdf)
+        self.assertEqual(texts[0], texts[1])
+
+    def test_render_batch_size_parallel(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        for counter in range(5):
+            self.addMessage(maildir, text="Message number " + str(counter))
+        maildir.add(b"This is total junk")
+        maildir.close()
+        with self.assertRaisesRegex(Exception, "1 of 6 messages could not be converted"):
+            self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                     extraParams=['--render-batch-size', '3', '--jobs', '2'])
+        self.assertEqual(5, len(self.getOutputPDFs()))
+
+    def test_render_batch_size_direct_plain_text(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        for counter in range(3):
+            self.addMessage(maildir, text="Message number " + str(counter))
+        self.msg = MIMEMultipart()
+        self.addHeaders()
+        self.attachHTML("<p>HTML message</p>")
+        maildir.add(self.msg.as_bytes())
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                         extraParams=['--render-batch-size', '4', '--direct-plain-text'])
+        self.assertEqual('', error)
+        output_pdfs = self.getOutputPDFs()
+        self.assertEqual(4, len(output_pdfs))
+        texts = "".join([self.getPDFText(output_pdf) for output_pdf in output_pdfs])
+        for counter in range(3):
+            self.assertRegex(texts, "Message number " + str(counter))
+        self.assertRegex(texts, "HTML message")
+
+    def test_pipeline(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        filenames = [self.addMessage(maildir, text="Message number " + str(counter), pdf_text="PDF " + str(counter))
+                     for counter in range(5)]
+        maildir.add(b"This is total junk")
+        self.msg = MIMEMultipart()
+        self.addHeaders()
+        self.attachHTML('<p>Missing images</p><img src="cid:missing"><img src="http://127.0.0.1:1/missing.png">')
+        maildir.add(self.msg.as_bytes())
+        maildir.close()
+        with self.assertRaisesRegex(Exception, "1 of 7 messages could not be converted"):
+            self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                     extraParams=['--pipeline', '2', '--max-renderers', '3'])
+        output_pdfs = self.getOutputPDFs()
+        self.assertEqual(6, len(output_pdfs))
+        texts = "".join([self.getPDFText(output_pdf) for output_pdf in output_pdfs])
+        for counter in range(5):
+            self.assertRegex(texts, "Message number " + str(counter))
+        self.assertRegex(texts, "Missing images")
+        for filename in filenames:
+            self.assertTrue(os.path.exists(os.path.join(self.workingDir, filename)))
+        warning_files = glob.glob(os.path.join(self.workingDir, "*" + self.WARNINGS_AND_ERRORS_POSTFIX))
+        self.assertEqual(2, len(warning_files))
+        warnings = "".join(open(warning_file).read() for warning_file in warning_files)
+        self.assertRegex(warnings, "Could not find image cid missing")
+        self.assertRegex(warnings, "Could not retrieve img URL")
+        self.assertEqual(1, len(glob.glob(os.path.join(self.workingDir, "*" + self.ORIGINAL_EMAIL_POSTFIX))))
+
+    def test_pipeline_with_jobs(self):
+        with self.assertRaisesRegex(Exception, "--pipeline cannot be used with --jobs"):
+            self.invokeBatchDirectly(inputMaildir=self.mailboxDir, extraParams=['--pipeline', '2', '--jobs', '2'])
+
+    def test_journal(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        filenames = [self.addMessage(maildir, text="Message number " + str(counter), pdf_text="PDF " + str(counter))
+                     for counter in range(3)]
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"), extraParams=['--journal'])
+        self.assertEqual('', error)
+        self.assertEqual(3, len(self.getOutputPDFs()))
+
+        connection = sqlite3.connect(os.path.join(self.workingDir, ".email2pdf_journal.sqlite"))
+        rows = connection.execute("SELECT message_id, content_hash, output_files FROM messages").fetchall()
+        connection.close()
+        self.assertEqual(3, len(rows))
+        output_files = sorted(chain.from_iterable(json.loads(row[2]) for row in rows))
+        self.assertEqual(sorted(filenames + [os.path.basename(pdf) for pdf in self.getOutputPDFs()]), output_files)
+
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        self.addMessage(maildir, text="Message number 3")
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"),
+                                         extraParams=['--journal', '--jobs', '2'])
+        self.assertEqual('', error)
+        self.assertEqual(4, len(self.getOutputPDFs()))
+        self.assertEqual(7, len(glob.glob(os.path.join(self.workingDir, "*.pdf"))))
+
+    def test_journal_failed_message_retried(self):
+        maildir = mailbox.Maildir(os.path.join(self.mailboxDir, "Maildir"))
+        maildir.add(b"This is total junk")
+        self.addMessage(maildir, text="Good message")
+        maildir.close()
+        for _ in range(2):
+            with self.assertRaisesRegex(Exception, "1 of 2 messages could not be converted"):
+                self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "Maildir"), extraParams=['--journal'])
+        self.assertEqual(1, len(self.getOutputPDFs()))
+
+    def test_journal_without_batch(self):
+        self.msg = MIMEMultipart()
+        with self.assertRaisesRegex(Exception, "--journal can only be used"):
+            self.invokeDirectly(extraParams=['--journal'])
+
+    def test_jobs_without_batch(self):
+        self.msg = MIMEMultipart()
+        with self.assertRaisesRegex(Exception, "--jobs"):
+            self.invokeDirectly(extraParams=['--jobs', '2'])
+
+    def test_maildir_doesnt_exist(self):
+        with self.assertRaisesRegex(Exception, "(?i)mailbox.*not.*exist"):
+            self.invokeBatchDirectly(inputMaildir=os.path.join(self.mailboxDir, "notexist"))
+
+    def test_output_file_not_allowed(self):
+        with self.assertRaisesRegex(Exception, "--output-file"):
+            self.invokeBatchDirectly(inputMaildir=self.mailboxDir,
+                                     extraParams=['-o', os.path.join(self.workingDir, "output.pdf")])
+
+    def tearDown(self):
+        super(Direct_Batch, self).tearDown()
+        shutil.rmtree(self.mailboxDir)
@@ -353,3 +353,30 @@ class Direct_CID(Email2PDFTestCase):
         self.assertTrue(os.path.exists(os.path.join(self.workingDir, 'floating_attachment')))
         self.assertFalse(self.existsByTimeWarning())
         self.assertFalse(self.existsByTimeOriginal())
+
+    def test_many_embedded_images(self):
+        self.addHeaders()
+        html = ""
+        for counter in range(30):
+            content_id = 'image' + str(counter)
+            self.attachImage('<' + content_id + '>' if counter % 2 else content_id, inline=True)
+            html += '<img src=cid:' + content_id + '>'
+        self.attachHTML(html)
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertEqual([os.path.basename(self.getTimedFilename())], os.listdir(self.workingDir))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_embedded_image_referenced_twice(self):
+        self.addHeaders()
+        image_filename = self.attachImage('myid', jpeg=False)
+        self.attachHTML('<img src=cid:myid><p>Some text</p><img src=cid:myid>')
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertRegex(self.getPDFText(self.getTimedFilename()), "Some text")
+        self.assertFalse(os.path.exists(os.path.join(self.workingDir, image_filename)))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
@@ -83,3 +83,15 @@ class Direct_Metadata(Email2PDFTestCase):
         self.assertEqual("email2pdf", self.getMetadataField(timedFilename, "Producer"))
         self.assertFalse(self.existsByTimeWarning())
         self.assertFalse(self.existsByTimeOriginal())
+
+    def test_metadata_incremental_update(self):
+        self.addHeaders()
+        self.setPlainContent("Hello!")
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        timedFilename = self.getTimedFilename()
+        with open(timedFilename, 'rb') as pdf_file:
+            self.assertEqual(2, pdf_file.read().count(b"startxref"))
+        self.assertEqual(Email2PDFTestCase.DEFAULT_SUBJECT, self.getMetadataField(timedFilename, "Title"))
+        self.assertEqual("email2pdf", self.getMetadataField(timedFilename, "Producer"))
+        self.assertRegex(self.getPDFText(timedFilename), "Hello!")
@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+
 from tests import BaseTestClasses
 
 
@@ -8,3 +12,46 @@ class Direct_Module(BaseTestClasses.Email2PDFTestCase):
     def test_import(self):
         import email2pdf
         self.assertEqual(email2pdf.WKHTMLTOPDF_EXTERNAL_COMMAND, 'wkhtmltopdf')
+
+    def test_mime_type_cache(self):
+        import email2pdf
+        with open(self.JPG_FILENAME, 'rb') as image_file:
+            image_data = image_file.read()
+        self.assertEqual('image/jpeg', email2pdf.get_mime_type(image_data))
+        magic_handle = email2pdf.MAGIC_HANDLE
+        self.assertIn(email2pdf.hashlib.sha1(image_data).digest(), email2pdf.MIME_TYPE_CACHE)
+        self.assertEqual('image/jpeg', email2pdf.get_mime_type(image_data))
+        self.assertIs(magic_handle, email2pdf.MAGIC_HANDLE)
+
+    def test_unique_version(self):
+        import email2pdf
+        for name in ["invoice.pdf", "invoice_1.pdf", "invoice_3.pdf"]:
+            open(os.path.join(self.workingDir, name), 'w').close()
+        invoice = os.path.join(self.workingDir, "invoice.pdf")
+        self.assertEqual(os.path.join(self.workingDir, "invoice_2.pdf"), email2pdf.get_unique_version(invoice))
+        open(os.path.join(self.workingDir, "invoice_4.pdf"), 'w').close()
+        self.assertEqual(os.path.join(self.workingDir, "invoice_5.pdf"), email2pdf.get_unique_version(invoice))
+        self.assertTrue(os.path.exists(os.path.join(self.workingDir, "invoice_5.pdf")))
+        self.assertEqual(os.path.join(self.workingDir, "invoice_6.pdf"),
+                         email2pdf.get_unique_version(invoice, reserve=False))
+        self.assertFalse(os.path.exists(os.path.join(self.workingDir, "invoice_6.pdf")))
+        self.assertEqual(os.path.join(self.workingDir, "invoice_7.pdf"), email2pdf.get_unique_version(invoice))
+        self.assertEqual(os.path.join(self.workingDir, "other.pdf"),
+                         email2pdf.get_unique_version(os.path.join(self.workingDir, "other.pdf")))
+
+    def test_heavy_modules_not_imported_at_startup(self):
+        code = ("import importlib.machinery, sys; "
+                "importlib.machinery.SourceFileLoader('email2pdf', sys.argv[1]).load_module(); "
+                "print(' '.join(sorted(module for module in ['bs4', 'chardet', 'magic', 'PyPDF2'] if module in sys.modules)))")
+        output = subprocess.check_output([sys.executable, '-c', code, self._get_original_script_path()],
+                                         universal_newlines=True)
+        self.assertEqual('', output.strip())
+
+    def test_bs4_not_imported_without_images(self):
+        code = ("import importlib.machinery, sys; "
+                "email2pdf = importlib.machinery.SourceFileLoader('email2pdf', sys.argv[1]).load_module(); "
+                "email2pdf.remove_invalid_urls('<p>No images here</p>'); "
+                "print('bs4' in sys.modules)")
+        output = subprocess.check_output([sys.executable, '-c', code, self._get_original_script_path()],
+                                         universal_newlines=True)
+        self.assertEqual('False', output.strip())
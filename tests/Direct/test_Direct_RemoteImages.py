@@ -0,0 +1,219 @@
+from email.mime.multipart import MIMEMultipart
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest.mock
+
+from tests.BaseTestClasses import Email2PDFTestCase
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.server.requests.append(('HEAD', self.path))
+        if self.path.startswith('/nohead'):
+            self.send_empty_response(405)
+        else:
+            self.respond()
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path))
+        self.respond()
+
+    def respond(self):
+        if self.path.startswith('/redirect'):
+            self.send_response(302)
+            self.send_header('Location', '/image.png')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path.startswith('/image.png') or self.path.startswith('/nohead'):
+            with open(Email2PDFTestCase.PNG_FILENAME, 'rb') as image_file:
+                image_data = image_file.read()
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(image_data)))
+            self.end_headers()
+            if self.command == 'GET':
+                self.wfile.write(image_data)
+        else:
+            self.send_empty_response(404)
+
+    def send_empty_response(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class Direct_RemoteImages(Email2PDFTestCase):
+    def setUp(self):
+        super(Direct_RemoteImages, self).setUp()
+        self.msg = MIMEMultipart()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubImageHandler)
+        self.server.block_on_close = False
+        self.server.requests = []
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.start()
+        self.baseURL = 'http://127.0.0.1:' + str(self.server.server_port)
+        self.cacheDir = tempfile.mkdtemp(dir='/tmp')
+
+    def test_remote_images(self):
+        self.addHeaders()
+        self.attachHTML('<p>Some text</p>' +
+                        ''.join('<img src="' + self.baseURL + '/image.png?number=' + str(counter) + '">'
+                                for counter in range(20)))
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertEqual(20, len(self.server.requests))
+        self.assertTrue(all(method == 'HEAD' for (method, _) in self.server.requests))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_remote_image_missing(self):
+        self.addHeaders()
+        self.attachHTML('<img src="' + self.baseURL + '/image.png"><img src="' + self.baseURL + '/missing.png">')
+        error = self.invokeDirectly()
+        self.assertRegex(error, "(?i)could not retrieve img URL " + self.baseURL + "/missing.png")
+        self.assertNotRegex(error, "image.png")
+        self.assertTrue(self.existsByTime())
+        self.assertIn(('GET', '/missing.png'), self.server.requests)
+
+    def test_remote_image_redirect_and_no_head(self):
+        self.addHeaders()
+        self.attachHTML('<img src="' + self.baseURL + '/redirect"><img src="' + self.baseURL + '/nohead">')
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        self.assertIn(('HEAD', '/image.png'), self.server.requests)
+        self.assertIn(('GET', '/nohead'), self.server.requests)
+
+    def test_remote_image_checked_once(self):
+        self.addHeaders()
+        self.attachHTML('<img src="' + self.baseURL + '/image.png">' * 5)
+        error = self.invokeDirectly()
+        self.assertEqual('', error)
+        self.assertEqual([('HEAD', '/image.png')], self.server.requests)
+
+    def test_remote_image_missing_lxml(self):
+        self.addHeaders()
+        self.attachHTML('<p>Some text<img src="' + self.baseURL + '/image.png"><img src="' + self.baseURL + '/missing.png">')
+        error = self.invokeDirectly(extraParams=['--html-parser', 'lxml'])
+        self.assertRegex(error, "(?i)could not retrieve img URL " + self.baseURL + "/missing.png")
+        self.assertNotRegex(error, "image.png")
+        self.assertTrue(self.existsByTime())
+        self.assertRegex(self.getPDFText(self.getTimedFilename()), "Some text")
+
+    def test_remote_image_check_cache_bounded(self):
+        import email2pdf
+        with unittest.mock.patch.object(email2pdf, 'URL_CHECK_CACHE_SIZE', 3):
+            for counter in range(5):
+                self.assertTrue(email2pdf.can_url_fetch(self.baseURL + '/image.png?number=' + str(counter)))
+        self.assertEqual([self.baseURL + '/image.png?number=' + str(counter) for counter in range(2, 5)],
+                         list(email2pdf.URL_CHECK_CACHE))
+
+        with unittest.mock.patch.object(email2pdf, 'URL_CHECK_CACHE_TTL', -1):
+            self.assertTrue(email2pdf.can_url_fetch(self.baseURL + '/image.png?number=5'))
+        self.assertTrue(email2pdf.can_url_fetch(self.baseURL + '/image.png?number=5'))
+        self.assertTrue(email2pdf.can_url_fetch(self.baseURL + '/image.png?number=5'))
+        self.assertEqual(2, self.server.requests.count(('HEAD', '/image.png?number=5')))
+
+    def test_idle_connections_bounded(self):
+        import email2pdf
+        connections = [unittest.mock.Mock() for _ in range(12)]
+        with unittest.mock.patch.object(email2pdf, 'URL_CHECK_IDLE_CONNECTIONS_PER_HOST', 2), \
+                unittest.mock.patch.object(email2pdf, 'URL_CHECK_IDLE_CONNECTIONS', 5):
+            for counter, connection in enumerate(connections):
+                email2pdf.release_url_check_connection('http', 'host' + str(counter % 4), connection)
+        self.assertEqual(7, len([connection for connection in connections if connection.close.called]))
+        self.assertEqual(5, sum(len(idle_connections) for idle_connections in email2pdf.URL_CHECK_CONNECTIONS.values()))
+        self.assertEqual([], [connection for connection in connections[8:] if connection.close.called])
+
+        email2pdf.close_url_check_connections()
+        self.assertTrue(all(connection.close.called for connection in connections))
+        self.assertEqual({}, email2pdf.URL_CHECK_CONNECTIONS)
+
+    def test_unmodified_payload_not_reserialised(self):
+        import email2pdf
+        for html_parser in ('html5lib', 'lxml'):
+            payload = '<p>Some text<img src="' + self.baseURL + '/image.png"><img src="data:image/png;base64,AAAA">'
+            self.assertIs(payload, email2pdf.remove_invalid_urls(payload, html_parser))
+            self.assertNotIn('broken', email2pdf.remove_invalid_urls(payload + '<img src="broken">', html_parser))
+
+    def test_image_cache(self):
+        cache_dir = os.path.join(self.cacheDir, "cache")
+        self.addHeaders()
+        self.attachHTML('<p>Some text</p><img src="' + self.baseURL + '/image.png">')
+        error = self.invokeDirectly(extraParams=['--image-cache', cache_dir])
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertEqual([('GET', '/image.png')], self.server.requests)
+        self.assertEqual(2, len(os.listdir(cache_dir)))
+        os.remove(self.getTimedFilename())
+
+        error = self.invokeDirectly(extraParams=['--image-cache', cache_dir, '--offline'])
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertEqual([('GET', '/image.png')], self.server.requests)
+
+    def test_image_cache_too_big(self):
+        import email2pdf
+        with unittest.mock.patch.object(email2pdf, 'IMAGE_DOWNLOAD_MAX_SIZE', 100):
+            self.assertIsNone(email2pdf.download_image(self.baseURL + '/image.png'))
+        self.assertIsNotNone(email2pdf.download_image(self.baseURL + '/image.png'))
+        self.assertEqual([('GET', '/image.png')] * 2, self.server.requests)
+
+    def test_offline(self):
+        self.addHeaders()
+        self.attachHTML('<p>Some text</p><img src="' + self.baseURL + '/image.png">')
+        error = self.invokeDirectly(extraParams=['--offline'])
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertEqual([], self.server.requests)
+        self.assertFalse(self.existsByTimeWarning())
+
+    def test_image_cache_eviction(self):
+        import email2pdf
+        cache = email2pdf.DiskCache(self.cacheDir, 2500)
+        for counter in range(5):
+            cache.put("entry" + str(counter), b"x" * 1000)
+            os.utime(os.path.join(self.cacheDir, "entry" + str(counter)), (counter, counter))
+            cache.get("entry0")
+        self.assertEqual(["entry0", "entry4"], sorted(os.listdir(self.cacheDir)))
+
+    def test_image_cache_entry_removed_after_read(self):
+        import email2pdf
+        cache = email2pdf.DiskCache(self.cacheDir, 10000)
+        cache.put("entry", b"Some data")
+        with unittest.mock.patch('os.utime', side_effect=FileNotFoundError):
+            self.assertEqual(b"Some data", cache.get("entry"))
+        self.assertIsNone(cache.get("missing"))
+
+    def test_image_cache_size_tracked(self):
+        import email2pdf
+        cache = email2pdf.DiskCache(self.cacheDir, 10000)
+        with unittest.mock.patch('os.scandir', wraps=os.scandir) as scandir:
+            for counter in range(9):
+                cache.put("entry" + str(counter), b"x" * 1000)
+                os.utime(os.path.join(self.cacheDir, "entry" + str(counter)), (counter, counter))
+            cache.put("entry0", b"x" * 1000)
+            self.assertEqual(1, scandir.call_count)
+            self.assertEqual(9000, cache.total_size)
+
+            cache.put("entry9", b"x" * 2000)
+            self.assertEqual(2, scandir.call_count)
+        self.assertEqual(["entry0", "entry3", "entry4", "entry5", "entry6", "entry7", "entry8", "entry9"],
+                         sorted(os.listdir(self.cacheDir)))
+        self.assertEqual(9000, cache.total_size)
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        super(Direct_RemoteImages, self).tearDown()
@@ -0,0 +1,63 @@
+from email.mime.multipart import MIMEMultipart
+
+import json
+import os
+import shutil
+import tempfile
+
+from tests.BaseTestClasses import Email2PDFTestCase
+
+
+class Direct_RenderCache(Email2PDFTestCase):
+    def setUp(self):
+        super(Direct_RenderCache, self).setUp()
+        self.cacheDir = tempfile.mkdtemp(dir='/tmp')
+        self.reportFile = os.path.join(self.cacheDir, "timing.jsonl")
+
+    def convert(self, subject, html, output_name, extraParams=None):
+        self.msg = MIMEMultipart()
+        self.addHeaders(subject=subject)
+        self.attachHTML(html)
+        output_file = os.path.join(self.workingDir, output_name)
+        error = self.invokeDirectly(outputFile=output_file,
+                                    extraParams=['--render-cache', os.path.join(self.cacheDir, "cache"),
+                                                 '--timing-report', self.reportFile] + (extraParams or []))
+        self.assertEqual('', error)
+        with open(self.reportFile) as report_file:
+            record = json.loads(report_file.readlines()[-1])
+        return (output_file, record)
+
+    def test_render_cache(self):
+        (first_file, first_record) = self.convert("First subject", "<p>Notification</p>", "first.pdf")
+        (second_file, second_record) = self.convert("Second subject", "<p>Notification</p>", "second.pdf")
+        self.assertNotIn('render_cache_hits', first_record)
+        self.assertEqual(1, len(first_record['wkhtmltopdf']))
+        self.assertEqual(1, second_record['render_cache_hits'])
+        self.assertEqual(0, len(second_record['wkhtmltopdf']))
+        self.assertRegex(self.getPDFText(second_file), "Notification")
+        self.assertEqual("First subject", self.getMetadataField(first_file, "Title"))
+        self.assertEqual("Second subject", self.getMetadataField(second_file, "Title"))
+
+    def test_render_cache_different_payload(self):
+        self.convert("Subject", "<p>Notification</p>", "first.pdf")
+        (_, record) = self.convert("Subject", "<p>Another notification</p>", "second.pdf")
+        self.assertNotIn('render_cache_hits', record)
+
+    def test_render_cache_headers(self):
+        self.convert("First subject", "<p>Notification</p>", "first.pdf", extraParams=['--headers'])
+        (second_file, record) = self.convert("Second subject", "<p>Notification</p>", "second.pdf",
+                                             extraParams=['--headers'])
+        self.assertNotIn('render_cache_hits', record)
+        self.assertRegex(self.getPDFText(second_file), "Second subject")
+
+    def test_render_cache_shared(self):
+        import argparse
+        import email2pdf
+        args = argparse.Namespace(render_cache=os.path.join(self.cacheDir, "cache"), render_cache_size=1)
+        render_cache = email2pdf.get_render_cache(args)
+        self.assertIs(render_cache, email2pdf.get_render_cache(args))
+        self.assertIs(render_cache, email2pdf.get_disk_cache(os.path.join(self.cacheDir, "cache", ""), 1024 * 1024))
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+        super(Direct_RenderCache, self).tearDown()
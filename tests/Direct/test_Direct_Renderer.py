@@ -0,0 +1,84 @@
+from email.mime.multipart import MIMEMultipart
+
+import os
+import shlex
+import unittest
+import unittest.mock
+
+from tests import BaseTestClasses
+
+try:
+    import weasyprint  # noqa: F401
+    WEASYPRINT_AVAILABLE = True
+except (ImportError, OSError):
+    WEASYPRINT_AVAILABLE = False
+
+
+class Direct_Renderer(BaseTestClasses.Email2PDFTestCase):
+    def setUp(self):
+        super(Direct_Renderer, self).setUp()
+        self.msg = MIMEMultipart()
+
+    def test_wkhtmltopdf(self):
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        error = self.invokeDirectly(extraParams=['--renderer', 'wkhtmltopdf'])
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertRegex(self.getPDFText(self.getTimedFilename()), "Some basic textual content")
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_wkhtmltopdf_grouped_input_same_as_single(self):
+        import email2pdf
+        inputs = []
+
+        def run_wkhtmltopdf(arguments, input_data):
+            if arguments == ['--read-args-from-stdin']:
+                argument_lines = [shlex.split(os.fsdecode(line)) for line in input_data.splitlines()]
+            else:
+                self.assertEqual(b'', input_data)
+                argument_lines = [arguments]
+            for (input_file_name, output_file_name) in argument_lines:
+                with open(input_file_name, 'rb') as input_file:
+                    inputs.append((os.path.basename(input_file_name), os.listdir(os.path.dirname(input_file_name)),
+                                   input_file.read()))
+                with open(output_file_name, 'wb') as output_file:
+                    output_file.write(b'%PDF-1.4')
+            return (0, b'')
+
+        jobs = [(b'<img src="image.png"><a href="1.html">Relative</a>', os.path.join(self.workingDir, "first.pdf")),
+                (b'<img src="../0/body.html">', os.path.join(self.workingDir, "second.pdf"))]
+        renderer = email2pdf.WkhtmltopdfRenderer()
+        with unittest.mock.patch.object(email2pdf, 'run_wkhtmltopdf', side_effect=run_wkhtmltopdf):
+            for (payload, output_file_name) in jobs:
+                self.assertIsNone(renderer.render_one(payload, output_file_name))
+            self.assertEqual([None, None], renderer.render(jobs))
+        self.assertEqual(4, len(inputs))
+        self.assertEqual(inputs[:2], inputs[2:])
+        self.assertEqual([("body.html", ["body.html"], payload) for (payload, _) in jobs], inputs[:2])
+
+    @unittest.skipUnless(WEASYPRINT_AVAILABLE, "WeasyPrint not installed.")
+    def test_weasyprint(self):
+        path = os.path.join(self.examineDir, "weasyprintRenderer.pdf")
+        self.addHeaders()
+        self.attachHTML("<p>Some basic HTML content</p>")
+        error = self.invokeDirectly(outputFile=path, extraParams=['--renderer', 'weasyprint'])
+        self.assertEqual('', error)
+        self.assertTrue(os.path.exists(path))
+        self.assertRegex(self.getPDFText(path), "Some basic HTML content")
+        self.assertEqual(self.getMetadataField(path, "Producer"), "email2pdf")
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    @unittest.skipIf(WEASYPRINT_AVAILABLE, "WeasyPrint is installed.")
+    def test_weasyprint_missing(self):
+        self.attachText("Some basic textual content")
+        with self.assertRaisesRegex(Exception, "(?i)requires WeasyPrint"):
+            self.invokeDirectly(extraParams=['--renderer', 'weasyprint'])
+        self.assertFalse(self.existsByTime())
+
+    def test_unknown_renderer(self):
+        with self.assertRaisesRegex(Exception, "(?i)invalid choice"):
+            self.invokeDirectly(extraParams=['--renderer', 'notexist'])
+        self.assertFalse(self.existsByTime())
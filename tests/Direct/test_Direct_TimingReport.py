@@ -0,0 +1,87 @@
+from email.mime.multipart import MIMEMultipart
+
+import json
+import mailbox
+import os
+import shutil
+import tempfile
+
+from tests.BaseTestClasses import Email2PDFTestCase
+
+
+class Direct_TimingReport(Email2PDFTestCase):
+    def setUp(self):
+        super(Direct_TimingReport, self).setUp()
+        self.msg = MIMEMultipart()
+        self.reportDir = tempfile.mkdtemp(dir='/tmp')
+        self.reportFile = os.path.join(self.reportDir, "timing.jsonl")
+
+    def getReport(self):
+        with open(self.reportFile) as report_file:
+            return [json.loads(line) for line in report_file]
+
+    def test_timing_report(self):
+        self.addHeaders()
+        self.attachHTML('<p>Some text</p><img src="cid:myid"><img src="cid:myid">')
+        self.attachImage('myid', inline=True)
+        self.attachPDF("Some PDF content")
+        error = self.invokeDirectly(extraParams=['--timing-report', self.reportFile])
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+
+        report = self.getReport()
+        self.assertEqual(1, len(report))
+        record = report[0]
+        self.assertEqual(0, record['status'])
+        self.assertEqual(self.getTimedFilename(), record['output_file'])
+        self.assertEqual(['get_input_data', 'get_input_email', 'handle_message_body', 'remove_invalid_urls',
+                          'output_body_pdf', 'add_update_pdf_metadata', 'handle_attachments'], list(record['stages']))
+        self.assertEqual(len(self.msg.as_bytes()), record['input_bytes'])
+        self.assertEqual(4, record['parts'])
+        self.assertEqual(2, record['cid_substitutions'])
+        self.assertEqual(1, record['attachments'])
+        self.assertEqual(os.path.getsize(self.getTimedFilename()), record['body_pdf_bytes'])
+        self.assertEqual(1, len(record['wkhtmltopdf']))
+        self.assertEqual(0, record['wkhtmltopdf'][0]['exit_status'])
+        self.assertGreater(record['wkhtmltopdf'][0]['max_rss_bytes'], 0)
+
+    def test_timing_report_appended(self):
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        self.invokeDirectly(extraParams=['--timing-report', self.reportFile])
+        self.invokeDirectly(extraParams=['--timing-report', self.reportFile, '--no-body'])
+        report = self.getReport()
+        self.assertEqual(2, len(report))
+        self.assertEqual(1, report[1]['status'])
+        self.assertNotIn('output_body_pdf', report[1]['stages'])
+
+    def test_timing_report_failure(self):
+        self.addHeaders()
+        self.attachPDF("Some PDF content")
+        with self.assertRaisesRegex(Exception, "No body parts found"):
+            self.invokeDirectly(extraParams=['--timing-report', self.reportFile])
+        report = self.getReport()
+        self.assertEqual(1, len(report))
+        self.assertEqual(2, report[0]['status'])
+
+    def test_timing_report_batch(self):
+        maildir = mailbox.Maildir(os.path.join(self.reportDir, "Maildir"))
+        for counter in range(3):
+            self.msg = MIMEMultipart()
+            self.addHeaders()
+            self.attachText("Message number " + str(counter))
+            maildir.add(self.msg.as_bytes())
+        maildir.close()
+        error = self.invokeBatchDirectly(inputMaildir=os.path.join(self.reportDir, "Maildir"),
+                                         extraParams=['--timing-report', self.reportFile, '--render-batch-size', '2'])
+        self.assertEqual('', error)
+        report = self.getReport()
+        self.assertEqual(3, len(report))
+        self.assertEqual(sorted(maildir.keys()), [record['input'] for record in report])
+        self.assertEqual([2, 2, 1], [record.get('messages_rendered_together', 1) for record in report])
+        self.assertTrue(all(record['status'] == 0 for record in report))
+        self.assertTrue(all('output_body_pdf' in record['stages'] for record in report))
+
+    def tearDown(self):
+        shutil.rmtree(self.reportDir)
+        super(Direct_TimingReport, self).tearDown()
@@ -0,0 +1,85 @@
+from email.mime.multipart import MIMEMultipart
+from subprocess import Popen, PIPE
+
+import os
+import shutil
+import tempfile
+import time
+
+from tests.BaseTestClasses import Email2PDFTestCase
+
+
+class TestServer(Email2PDFTestCase):
+    def setUp(self):
+        super(TestServer, self).setUp()
+        self.msg = MIMEMultipart()
+        self.socketDir = tempfile.mkdtemp(dir='/tmp')
+        self.socketPath = os.path.join(self.socketDir, "email2pdf.sock")
+        # The server runs in a different time zone from the clients, which
+        # should still get output files named by their own local time.
+        self.server = Popen([Email2PDFTestCase.COMMAND, '--serve', self.socketPath], stdout=PIPE, stderr=PIPE,
+                            env=dict(os.environ, TZ='Etc/GMT-14'))
+        for _ in range(100):
+            if os.path.exists(self.socketPath):
+                break
+            time.sleep(0.1)
+
+    def test_connect(self):
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        filename = self.attachPDF("Some PDF content")
+        (rc, output, error) = self.invokeAsSubprocess(extraParams=['--connect', self.socketPath])
+        self.assertEqual(0, rc)
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+        self.assertRegex(self.getPDFText(self.getTimedFilename()), "Some basic textual content")
+        self.assertTrue(os.path.exists(os.path.join(self.workingDir, filename)))
+        self.assertFalse(self.existsByTimeWarning())
+        self.assertFalse(self.existsByTimeOriginal())
+
+    def test_connect_relative_output_directory(self):
+        os.mkdir(os.path.join(self.workingDir, "output"))
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        (rc, output, error) = self.invokeAsSubprocess(extraParams=['-d', 'output', '--connect', self.socketPath])
+        self.assertEqual(0, rc)
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime(os.path.join(self.workingDir, "output")))
+
+    def test_connect_warning(self):
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        (rc, output, error) = self.invokeAsSubprocess(extraParams=['--connect', self.socketPath, '--no-body'])
+        self.assertEqual(1, rc)
+        self.assertRegex(error, "body.*any.*attachments")
+        self.assertTrue(self.existsByTimeWarning())
+        self.assertTrue(self.existsByTimeOriginal())
+
+    def test_connect_fatal(self):
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        (rc, output, error) = self.invokeAsSubprocess(outputDirectory="/notexist/",
+                                                      extraParams=['--connect', self.socketPath])
+        self.assertEqual(2, rc)
+        self.assertRegex(error, "(?i)directory.*not.*exist")
+
+    def test_connect_no_server(self):
+        self.addHeaders()
+        self.attachText("Some basic textual content")
+        (rc, output, error) = self.invokeAsSubprocess(extraParams=['--connect', os.path.join(self.socketDir, "notexist")])
+        self.assertEqual(0, rc)
+        self.assertEqual('', error)
+        self.assertTrue(self.existsByTime())
+
+    def test_server_already_running(self):
+        process = Popen([Email2PDFTestCase.COMMAND, '--serve', self.socketPath], stdout=PIPE, stderr=PIPE)
+        (output, error) = process.communicate()
+        self.assertEqual(2, process.returncode)
+        self.assertRegex(str(error, 'utf-8'), "already listening")
+
+    def tearDown(self):
+        self.server.terminate()
+        self.server.communicate()
+        self.assertFalse(os.path.exists(self.socketPath))
+        shutil.rmtree(self.socketDir)
+        super(TestServer, self).tearDown()